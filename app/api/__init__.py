@@ -2,5 +2,6 @@
 API exports for Cold Outreach Email Agent
 """
 from .routes import router
+from .debug import debug_router
 
-__all__ = ["router"]
+__all__ = ["router", "debug_router"]
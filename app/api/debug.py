@@ -0,0 +1,45 @@
+"""
+Debug Routes for Cold Outreach Email Agent
+
+Event-loop lag incidents and on-demand profiling.
+Disabled unless DEBUG_API_TOKEN is set; callers must send it as X-Debug-Token.
+"""
+import secrets
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+from app.services.loop_monitor import loop_monitor, loop_profiler
+from app.config import settings
+
+debug_router = APIRouter(prefix="/debug", include_in_schema=False)
+
+
+def _check_token(token: Optional[str]):
+    """Hide the endpoints entirely unless a matching token is configured and sent."""
+    if not settings.DEBUG_API_TOKEN or not token or not secrets.compare_digest(token, settings.DEBUG_API_TOKEN):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+@debug_router.get("/loop_lag")
+async def get_loop_lag(x_debug_token: Optional[str] = Header(None)):
+    """Recent event-loop blocking incidents with the stack that was running."""
+    _check_token(x_debug_token)
+    return loop_monitor.report()
+
+
+@debug_router.get("/profile", response_class=PlainTextResponse)
+async def profile_process(
+    seconds: float = Query(5.0, gt=0),
+    sort_by: str = Query("cumulative", pattern="^(cumulative|tottime|calls|ncalls)$"),
+    limit: int = Query(50, ge=1, le=500),
+    x_debug_token: Optional[str] = Header(None)
+):
+    """Profile the event loop thread for N seconds and return the cProfile report."""
+    _check_token(x_debug_token)
+    
+    if seconds > settings.PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be <= {settings.PROFILE_MAX_SECONDS}")
+    if loop_profiler.busy:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    
+    return await loop_profiler.profile(seconds, sort_by=sort_by, limit=limit)
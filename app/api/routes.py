@@ -15,6 +15,7 @@ from app.models.schemas import (
     DemoOutput
 )
 from app.services.job_manager import job_manager
+from app.services.payment_verifier import payment_verifier, PaymentError
 from app.config import settings
 
 router = APIRouter()
@@ -194,27 +195,43 @@ async def get_input_schema():
 async def start_job(request: StartJobRequest, background_tasks: BackgroundTasks):
     """
     MIP-003 Endpoint: Start a new cold outreach email generation job.
-    Creates a job and processes it in the background.
+    Creates a job and processes it in the background once payment is confirmed.
     """
+    payment = None
+    if payment_verifier.enabled:
+        input_hash = payment_verifier.hash_input(request.input_data.model_dump_json())
+        try:
+            payment = await payment_verifier.create_payment_request(
+                identifier_from_purchaser=request.identifier_from_purchaser,
+                input_hash=input_hash
+            )
+        except PaymentError as e:
+            raise HTTPException(status_code=502, detail=str(e))
+    
     # Create the job
     job_id = job_manager.create_job(
         identifier_from_purchaser=request.identifier_from_purchaser,
-        input_data=request.input_data
+        input_data=request.input_data,
+        payment=payment
     )
     
     # Process job in background
     background_tasks.add_task(job_manager.process_job, job_id)
     
+    payment_info = {
+        "amount": settings.PAYMENT_AMOUNT,
+        "unit": settings.PAYMENT_UNIT,
+        "agent_identifier": settings.AGENT_IDENTIFIER,
+        "network": settings.NETWORK
+    }
+    if payment:
+        payment_info.update(payment)
+    
     # Return response with payment info for Masumi integration
     return StartJobResponse(
         job_id=job_id,
-        status=JobStatus.PENDING,
-        payment_info={
-            "amount": settings.PAYMENT_AMOUNT,
-            "unit": settings.PAYMENT_UNIT,
-            "agent_identifier": settings.AGENT_IDENTIFIER,
-            "network": settings.NETWORK
-        },
+        status=job_manager.get_job(job_id)["status"],
+        payment_info=payment_info,
         message=f"Cold outreach email generation started for {request.input_data.recipient_name} at {request.input_data.recipient_company}"
     )
 
@@ -234,6 +251,7 @@ async def get_job_status(job_id: str):
         job_id=job["job_id"],
         status=job["status"],
         result=job["result"],
+        stage_timings=job["stage_timings"],
         created_at=job["created_at"],
         updated_at=job["updated_at"],
         error=job["error"]
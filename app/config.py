@@ -17,11 +17,41 @@ class Settings:
     MISTRAL_API_KEY: str = os.getenv("MISTRAL_API_KEY", "")
     MISTRAL_MODEL: str = "mistral-large-latest"
     
+    # Stage pipeline: how many stage outputs to keep, keyed by input hash (0 disables)
+    PIPELINE_CACHE_SIZE: int = int(os.getenv("PIPELINE_CACHE_SIZE", "256"))
+    # Also cache the LLM copy stage. Off by default: identical inputs would get the
+    # exact same email back, even for a different purchaser.
+    PIPELINE_CACHE_LLM_OUTPUT: bool = os.getenv("PIPELINE_CACHE_LLM_OUTPUT", "false").lower() == "true"
+    
+    # Personalization context is compressed to roughly this many tokens (0 disables)
+    CONTEXT_TOKEN_BUDGET: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", "600"))
+    # Most of the budget competitor notes may take before they get compressed too
+    CONTEXT_COMPETITOR_SHARE: float = float(os.getenv("CONTEXT_COMPETITOR_SHARE", "0.25"))
+    # Hard cap on each raw free-text field, applied before any parsing
+    CONTEXT_MAX_INPUT_CHARS: int = int(os.getenv("CONTEXT_MAX_INPUT_CHARS", "20000"))
+    
     # Payment Service Configuration (for Masumi integration)
     PAYMENT_SERVICE_URL: str = os.getenv("PAYMENT_SERVICE_URL", "http://localhost:3001/api/v1")
     PAYMENT_API_KEY: str = os.getenv("PAYMENT_API_KEY", "")
     AGENT_IDENTIFIER: str = os.getenv("AGENT_IDENTIFIER", "")
     NETWORK: str = os.getenv("NETWORK", "Preprod")
+    PAYMENT_POLL_INTERVAL: float = float(os.getenv("PAYMENT_POLL_INTERVAL", "10"))
+    PAYMENT_PAGE_SIZE: int = int(os.getenv("PAYMENT_PAGE_SIZE", "100"))  # payments per list request
+    PAYMENT_MAX_PAGES: int = int(os.getenv("PAYMENT_MAX_PAGES", "20"))  # per poll; logged loudly if hit
+    PAYMENT_PAY_BY_SECONDS: int = int(os.getenv("PAYMENT_PAY_BY_SECONDS", "3600"))
+    PAYMENT_SUBMIT_RESULT_SECONDS: int = int(os.getenv("PAYMENT_SUBMIT_RESULT_SECONDS", "7200"))
+    # Start generating before payment lands; the result is still held until paid
+    PAYMENT_SPECULATIVE_EXECUTION: bool = os.getenv("PAYMENT_SPECULATIVE_EXECUTION", "false").lower() == "true"
+    
+    # Worker pool size for paid jobs
+    MAX_CONCURRENT_JOBS: int = int(os.getenv("MAX_CONCURRENT_JOBS", "4"))
+    
+    # Event loop monitoring and on-demand profiling
+    LOOP_LAG_INTERVAL: float = float(os.getenv("LOOP_LAG_INTERVAL", "0.1"))
+    LOOP_LAG_THRESHOLD: float = float(os.getenv("LOOP_LAG_THRESHOLD", "0.25"))
+    LOOP_LAG_MAX_INCIDENTS: int = int(os.getenv("LOOP_LAG_MAX_INCIDENTS", "50"))
+    DEBUG_API_TOKEN: str = os.getenv("DEBUG_API_TOKEN", "")  # empty = /debug endpoints disabled
+    PROFILE_MAX_SECONDS: float = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
     
     # Agent Pricing (in tUSDM - 1 USDM = 1,000,000 smallest unit)
     PAYMENT_AMOUNT: int = 1000000  # 1 USDM
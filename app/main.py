@@ -4,17 +4,34 @@ Cold Outreach Email Agent - Main Entry Point
 MIP-003 compliant AI agent for the Masumi Network.
 Generates personalized cold outreach emails for B2B sales.
 """
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.routes import router
+from app.api.debug import debug_router
 from app.config import settings
+from app.services.payment_verifier import payment_verifier
+from app.services.loop_monitor import loop_monitor
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Watch the event loop while serving; release pooled connections on shutdown."""
+    loop_monitor.start()
+    try:
+        yield
+    finally:
+        await loop_monitor.stop()
+        await payment_verifier.close()
+
 
 app = FastAPI(
     title=settings.APP_NAME,
     description=settings.APP_DESCRIPTION,
     version=settings.APP_VERSION,
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # CORS middleware for cross-origin requests
@@ -28,6 +45,7 @@ app.add_middleware(
 
 # Include API routes
 app.include_router(router)
+app.include_router(debug_router)
 
 
 @app.get("/")
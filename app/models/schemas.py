@@ -9,6 +9,7 @@ from datetime import datetime
 
 class JobStatus(str, Enum):
     PENDING = "pending"
+    AWAITING_PAYMENT = "awaiting_payment"
     IN_PROGRESS = "in_progress"
     COMPLETED = "completed"
     FAILED = "failed"
@@ -73,6 +74,7 @@ class JobStatusResponse(BaseModel):
     job_id: str
     status: JobStatus
     result: Optional[Dict[str, Any]] = None
+    stage_timings: Optional[Dict[str, Dict[str, Any]]] = None
     created_at: datetime
     updated_at: datetime
     error: Optional[str] = None
@@ -1,12 +1,26 @@
 """
 Service layer exports for Cold Outreach Email Agent
 """
+from .pipeline import Stage, StageGraph, StageCache, PipelineError
 from .email_generator import email_generator, EmailGenerator
 from .job_manager import job_manager, JobManager
+from .payment_verifier import payment_verifier, PaymentVerifier, PaymentError
+from .loop_monitor import loop_monitor, loop_profiler, LoopLagMonitor, LoopProfiler
 
 __all__ = [
+    "Stage",
+    "StageGraph",
+    "StageCache",
+    "PipelineError",
     "email_generator",
     "EmailGenerator",
     "job_manager", 
-    "JobManager"
+    "JobManager",
+    "payment_verifier",
+    "PaymentVerifier",
+    "PaymentError",
+    "loop_monitor",
+    "loop_profiler",
+    "LoopLagMonitor",
+    "LoopProfiler"
 ]
@@ -0,0 +1,168 @@
+"""
+Context Compressor Service
+
+Trims oversized personalization inputs before they reach the prompt.
+Sentences are ranked by BM25 relevance to what the sender is offering,
+near-duplicates are dropped, and the best sentences are kept (in their
+original order) until the token budget is spent. Run-on text with no
+punctuation is cut into word windows first, so it can't be dropped whole;
+single "words" longer than a window (giant URLs, base64 blobs) are dropped
+rather than truncated. Fully local - no LLM calls.
+"""
+from typing import Dict, List, Optional, Tuple
+from collections import Counter
+import math
+import re
+from app.config import settings
+
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+WORD = re.compile(r"[a-z0-9]+")
+
+# Common words that would otherwise dominate short queries
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is",
+    "it", "its", "of", "on", "or", "our", "that", "the", "their", "this", "to", "was", "we",
+    "were", "will", "with", "you", "your"
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) - good enough for budgeting."""
+    return max(1, math.ceil(len(text) / 4)) if text else 0
+
+
+def tokenize(text: str) -> List[str]:
+    return [word for word in WORD.findall(text.lower()) if word not in STOPWORDS]
+
+
+class ContextCompressor:
+    def __init__(
+        self,
+        token_budget: Optional[int] = None,
+        k1: float = 1.5,
+        b: float = 0.75,
+        duplicate_threshold: float = 0.8,
+        max_segment_tokens: int = 60
+    ):
+        self.token_budget = settings.CONTEXT_TOKEN_BUDGET if token_budget is None else token_budget
+        self.max_segment_tokens = max_segment_tokens
+        self.k1 = k1
+        self.b = b
+        self.duplicate_threshold = duplicate_threshold
+
+    def split_sentences(self, text: str) -> List[str]:
+        return [sentence.strip() for sentence in SENTENCE_SPLIT.split(text) if sentence.strip()]
+
+    def _chunk(self, sentence: str, max_tokens: int) -> List[str]:
+        """Cut an overlong sentence into word windows of at most max_tokens."""
+        if estimate_tokens(sentence) <= max_tokens:
+            return [sentence]
+
+        max_chars = max_tokens * 4
+        chunks, current = [], ""
+        for word in sentence.split():
+            if len(word) > max_chars:
+                # A cut-off URL or address is worse than none at all
+                continue
+            candidate = f"{current} {word}" if current else word
+            if current and len(candidate) > max_chars:
+                chunks.append(current)
+                current = word
+            else:
+                current = candidate
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def _bm25_scores(self, documents: List[List[str]], query: List[str]) -> List[float]:
+        """Score each sentence against the query, treating sentences as the corpus."""
+        if not documents:
+            return []
+
+        avg_length = sum(len(doc) for doc in documents) / len(documents) or 1.0
+        doc_freq = Counter(term for doc in documents for term in set(doc))
+        total = len(documents)
+
+        scores = []
+        for doc in documents:
+            counts = Counter(doc)
+            score = 0.0
+            for term in set(query):
+                tf = counts.get(term, 0)
+                if not tf:
+                    continue
+                idf = math.log(1 + (total - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+                score += idf * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * len(doc) / avg_length))
+            scores.append(score)
+        return scores
+
+    def _is_duplicate(self, terms: set, kept: List[set]) -> bool:
+        for other in kept:
+            union = terms | other
+            if union and len(terms & other) / len(union) >= self.duplicate_threshold:
+                return True
+        return False
+
+    def compress(self, sections: Dict[str, List[str]], query: str, token_budget: Optional[int] = None) -> Dict[str, List[str]]:
+        """
+        Keep the most relevant sentences from every section within the token budget.
+        `sections` maps a label to its sentences; the same labels come back with
+        only the kept sentences, in their original order. `token_budget`
+        overrides the configured budget for this call.
+        """
+        budget = self.token_budget if token_budget is None else max(0, token_budget)
+        total_tokens = sum(estimate_tokens(s) for sentences in sections.values() for s in sentences)
+        if self.token_budget <= 0 or total_tokens <= budget:
+            return sections
+        if budget <= 0:
+            return {label: [] for label in sections}
+
+        segment_tokens = max(1, min(self.max_segment_tokens, budget))
+        candidates: List[Tuple[str, int, str]] = [
+            (label, position, chunk)
+            for label, sentences in sections.items()
+            for position, sentence in enumerate(sentences)
+            for chunk in self._chunk(sentence, segment_tokens)
+        ]
+        documents = [tokenize(sentence) for _, _, sentence in candidates]
+        scores = self._bm25_scores(documents, tokenize(query))
+
+        # Best first; ties go to earlier sentences, which tend to carry the lede
+        ranked = sorted(range(len(candidates)), key=lambda i: (-scores[i], i))
+
+        kept = set()
+        kept_terms: List[set] = []
+        used = 0
+        for i in ranked:
+            cost = estimate_tokens(candidates[i][2])
+            if used + cost > budget:
+                continue
+            terms = set(documents[i])
+            if self._is_duplicate(terms, kept_terms):
+                continue
+            kept.add(i)
+            kept_terms.append(terms)
+            used += cost
+
+        compressed: Dict[str, List[str]] = {label: [] for label in sections}
+        for i, (label, _, sentence) in enumerate(candidates):
+            if i in kept:
+                compressed[label].append(sentence)
+        return compressed
+
+    def compress_texts(self, texts: Dict[str, str], query: str, token_budget: Optional[int] = None) -> Dict[str, str]:
+        """
+        Same as compress() but for raw text fields. Text that fits is returned
+        exactly as given - bullets and line breaks intact; only trimmed fields
+        are rebuilt from their kept sentences.
+        """
+        sections = {label: self.split_sentences(text) for label, text in texts.items()}
+        compressed = self.compress(sections, query, token_budget=token_budget)
+        if compressed is sections:
+            return dict(texts)
+        return {label: " ".join(sentences) for label, sentences in compressed.items()}
+
+
+# Singleton instance
+context_compressor = ContextCompressor()
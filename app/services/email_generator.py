@@ -6,13 +6,24 @@ Uses Mistral AI to generate personalized cold outreach emails.
 from mistralai import Mistral
 from app.config import settings
 from app.models.schemas import EmailInput, EmailTone, EmailLength
-from typing import Dict, Any, List
+from app.services.pipeline import Stage, StageGraph, StageCache
+from app.services.context_compressor import context_compressor, estimate_tokens
+from typing import Dict, Any, List, Tuple
 
 
 class EmailGenerator:
     def __init__(self):
         self.client = Mistral(api_key=settings.MISTRAL_API_KEY)
         self.model = settings.MISTRAL_MODEL
+        self.pipeline = StageGraph(
+            [
+                Stage("context", self._context_stage, inputs=["input_data"], outputs=["personalization_context"], cache=True),
+                Stage("prompt", self._prompt_stage, inputs=["input_data", "personalization_context"], outputs=["prompt"]),
+                Stage("copy", self._copy_stage, inputs=["prompt"], outputs=["email_content"], cache=settings.PIPELINE_CACHE_LLM_OUTPUT),
+                Stage("format", self._format_stage, inputs=["input_data", "email_content"], outputs=["result"])
+            ],
+            cache=StageCache(max_size=settings.PIPELINE_CACHE_SIZE)
+        )
     
     def _get_tone_instructions(self, tone: EmailTone) -> str:
         """Get writing style instructions based on tone."""
@@ -36,29 +47,39 @@ class EmailGenerator:
         return instructions.get(length, instructions[EmailLength.MEDIUM])
     
     def _build_personalization_context(self, input_data: EmailInput) -> str:
-        """Build personalization context from input data."""
-        context_parts = []
-        
-        if input_data.personalization_notes:
-            context_parts.append(f"Personal details: {input_data.personalization_notes}")
-        
-        if input_data.previous_interaction:
-            context_parts.append(f"Previous interaction: {input_data.previous_interaction}")
+        """Build personalization context from input data, trimmed to the token budget."""
+        max_chars = settings.CONTEXT_MAX_INPUT_CHARS
+        free_text = {
+            "Personal details": (input_data.personalization_notes or "")[:max_chars].strip(),
+            "Previous interaction": (input_data.previous_interaction or "")[:max_chars].strip()
+        }
+        competitor = {"Competitor context": (input_data.competitor_mentions or "")[:max_chars].strip()}
+        pain_points = [p.strip() for p in input_data.specific_pain_points or [] if p.strip()]
         
-        if input_data.specific_pain_points:
-            context_parts.append(f"Pain points to address: {', '.join(input_data.specific_pain_points)}")
+        # Rank pasted profiles/pages by relevance to what we're actually selling
+        query = f"{input_data.product_or_service} {input_data.value_proposition}"
+        budget = context_compressor.token_budget
+        if budget > 0:
+            # Pain points are short, explicit picks - always kept and paid for first
+            remaining = budget - sum(estimate_tokens(p) for p in pain_points)
+            # Competitor notes stay whole up to their share; a pasted page gets squeezed into it
+            competitor_share = max(0, int(remaining * settings.CONTEXT_COMPETITOR_SHARE))
+            competitor = context_compressor.compress_texts(competitor, query, token_budget=competitor_share)
+            remaining -= estimate_tokens(competitor["Competitor context"])
+            free_text = context_compressor.compress_texts(free_text, query, token_budget=remaining)
         
-        if input_data.competitor_mentions:
-            context_parts.append(f"Competitor context: {input_data.competitor_mentions}")
+        sections = {
+            **free_text,
+            "Pain points to address": ", ".join(pain_points),
+            **competitor
+        }
+        context_parts = [f"{label}: {text}" for label, text in sections.items() if text]
         
         return "\n".join(context_parts) if context_parts else "No additional context provided."
     
-    async def generate_email(self, input_data: EmailInput) -> Dict[str, Any]:
-        """Generate personalized cold outreach email(s)."""
-        
-        personalization_context = self._build_personalization_context(input_data)
-        
-        prompt = f"""You are an expert B2B sales copywriter specializing in cold outreach emails that get responses. Generate a personalized cold outreach email based on the following information.
+    def _build_prompt(self, input_data: EmailInput, personalization_context: str) -> str:
+        """Assemble the copywriting prompt."""
+        return f"""You are an expert B2B sales copywriter specializing in cold outreach emails that get responses. Generate a personalized cold outreach email based on the following information.
 
 ## SENDER INFORMATION
 - Name: {input_data.sender_name}
@@ -100,6 +121,14 @@ class EmailGenerator:
 {f'Generate {input_data.num_variations} different variations of this email, each with a unique angle or approach. Separate each variation with "---VARIATION---"' if input_data.num_variations > 1 else 'Generate the email now:'}
 """
 
+    def _context_stage(self, input_data: EmailInput) -> Dict[str, Any]:
+        return {"personalization_context": self._build_personalization_context(input_data)}
+    
+    def _prompt_stage(self, input_data: EmailInput, personalization_context: str) -> Dict[str, Any]:
+        return {"prompt": self._build_prompt(input_data, personalization_context)}
+    
+    async def _copy_stage(self, prompt: str) -> Dict[str, Any]:
+        """Copy agent: the LLM call that writes the email(s)."""
         response = await self.client.chat.complete_async(
             model=self.model,
             messages=[
@@ -116,8 +145,10 @@ class EmailGenerator:
             max_tokens=2000
         )
         
-        email_content = response.choices[0].message.content
-        
+        return {"email_content": response.choices[0].message.content}
+    
+    def _format_stage(self, input_data: EmailInput, email_content: str) -> Dict[str, Any]:
+        """Split variations and attach metadata."""
         # Parse variations if multiple were requested
         if input_data.num_variations > 1 and "---VARIATION---" in email_content:
             variations = [v.strip() for v in email_content.split("---VARIATION---") if v.strip()]
@@ -135,6 +166,16 @@ class EmailGenerator:
             }
         }
         
+        return {"result": result}
+    
+    async def run_pipeline(self, input_data: EmailInput) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+        """Run the stage graph and return the result with per-stage timings."""
+        values, timings = await self.pipeline.run({"input_data": input_data})
+        return values["result"], timings
+    
+    async def generate_email(self, input_data: EmailInput) -> Dict[str, Any]:
+        """Generate personalized cold outreach email(s)."""
+        result, _ = await self.run_pipeline(input_data)
         return result
 
 
@@ -3,19 +3,29 @@ Job Manager Service
 
 Handles job creation, tracking, and processing for email generation.
 """
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
 from datetime import datetime
 import uuid
+from app.config import settings
 from app.models.schemas import JobStatus, EmailInput
 from app.services.email_generator import email_generator
+from app.services.payment_verifier import payment_verifier
 import asyncio
 
 
 class JobManager:
     def __init__(self):
         self.jobs: Dict[str, dict] = {}
+        self._worker_slots: Optional[asyncio.Semaphore] = None
     
-    def create_job(self, identifier_from_purchaser: str, input_data: EmailInput) -> str:
+    @property
+    def worker_slots(self) -> asyncio.Semaphore:
+        """Bounded worker pool - created lazily so it binds to the running loop."""
+        if self._worker_slots is None:
+            self._worker_slots = asyncio.Semaphore(settings.MAX_CONCURRENT_JOBS)
+        return self._worker_slots
+    
+    def create_job(self, identifier_from_purchaser: str, input_data: EmailInput, payment: Optional[dict] = None) -> str:
         """Create a new job and return the job ID."""
         job_id = str(uuid.uuid4())
         
@@ -23,8 +33,10 @@ class JobManager:
             "job_id": job_id,
             "identifier_from_purchaser": identifier_from_purchaser,
             "input_data": input_data,
-            "status": JobStatus.PENDING,
+            "payment": payment,
+            "status": JobStatus.AWAITING_PAYMENT if payment else JobStatus.PENDING,
             "result": None,
+            "stage_timings": None,
             "error": None,
             "created_at": datetime.utcnow(),
             "updated_at": datetime.utcnow()
@@ -36,7 +48,7 @@ class JobManager:
         """Get job by ID."""
         return self.jobs.get(job_id)
     
-    def update_job_status(self, job_id: str, status: JobStatus, result: dict = None, error: str = None):
+    def update_job_status(self, job_id: str, status: JobStatus, result: dict = None, error: str = None, stage_timings: dict = None):
         """Update job status."""
         if job_id in self.jobs:
             self.jobs[job_id]["status"] = status
@@ -46,23 +58,54 @@ class JobManager:
                 self.jobs[job_id]["result"] = result
             if error:
                 self.jobs[job_id]["error"] = error
+            if stage_timings:
+                self.jobs[job_id]["stage_timings"] = stage_timings
+    
+    async def _generate(self, input_data: EmailInput) -> Tuple[dict, dict]:
+        """Run the generation pipeline inside the worker pool."""
+        async with self.worker_slots:
+            return await email_generator.run_pipeline(input_data)
     
     async def process_job(self, job_id: str):
-        """Process the email generation job."""
+        """Process the email generation job, holding it until payment is confirmed."""
         job = self.get_job(job_id)
         if not job:
             return
         
+        payment = job.get("payment")
+        speculative_task = None
+        
         try:
+            if payment:
+                # Optionally get a head start; the result stays private until paid
+                if settings.PAYMENT_SPECULATIVE_EXECUTION:
+                    speculative_task = asyncio.create_task(self._generate(job["input_data"]))
+                
+                await payment_verifier.wait_for_payment(
+                    job_id,
+                    payment["blockchain_identifier"],
+                    payment.get("pay_by_time")
+                )
+            
             self.update_job_status(job_id, JobStatus.IN_PROGRESS)
             
             # Generate the email
-            result = await email_generator.generate_email(job["input_data"])
+            if speculative_task:
+                result, stage_timings = await speculative_task
+            else:
+                result, stage_timings = await self._generate(job["input_data"])
             
-            self.update_job_status(job_id, JobStatus.COMPLETED, result=result)
+            self.update_job_status(job_id, JobStatus.COMPLETED, result=result, stage_timings=stage_timings)
             
         except Exception as e:
-            self.update_job_status(job_id, JobStatus.FAILED, error=str(e))
+            if speculative_task:
+                if speculative_task.done():
+                    if not speculative_task.cancelled():
+                        speculative_task.exception()  # retrieved so asyncio doesn't warn
+                else:
+                    speculative_task.cancel()
+            # Keep timings for the stages that did run - that's when they matter most
+            self.update_job_status(job_id, JobStatus.FAILED, error=str(e), stage_timings=getattr(e, "stage_timings", None))
 
 
 # Singleton instance
@@ -0,0 +1,131 @@
+"""
+Event Loop Monitor Service
+
+Spots synchronous work that blocks the event loop and profiles the loop on demand.
+A heartbeat task measures how late the loop wakes it up; a watchdog thread
+grabs the loop thread's stack while it is stuck so each incident says who did it.
+Captured stacks are tagged with the heartbeat they belong to, so a stack taken
+just as the loop recovered is never attached to a later incident.
+"""
+from typing import Dict, List, Optional, Any, Tuple
+from collections import deque
+from datetime import datetime
+import asyncio
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+import traceback
+from app.config import settings
+
+
+class LoopLagMonitor:
+    def __init__(self):
+        self.interval = settings.LOOP_LAG_INTERVAL
+        self.threshold = settings.LOOP_LAG_THRESHOLD
+        self.incidents: deque = deque(maxlen=settings.LOOP_LAG_MAX_INCIDENTS)
+        self.max_lag_ms: float = 0.0
+        self._heartbeat: float = 0.0
+        # (heartbeat the stack was captured for, formatted stack) - replaced atomically
+        self._blocked_stack: Optional[Tuple[float, List[str]]] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Start the heartbeat task and watchdog thread on the running loop."""
+        if self._task and not self._task.done():
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._sample())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _sample(self):
+        """Sleep for a fixed interval and record how late the loop woke us."""
+        while True:
+            beat = self._heartbeat
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+
+            lag = now - expected
+            if lag >= self.threshold:
+                self._record(lag, beat)
+            self._heartbeat = now
+
+    def _watch(self):
+        """Watchdog thread: capture the loop thread's stack while the heartbeat is stale."""
+        while not self._stop.wait(self.threshold / 2):
+            beat = self._heartbeat
+            stale = time.monotonic() - beat - self.interval
+            captured = self._blocked_stack
+            if stale >= self.threshold and (captured is None or captured[0] != beat):
+                frame = sys._current_frames().get(self._loop_thread_id)
+                if frame is not None:
+                    self._blocked_stack = (beat, traceback.format_stack(frame))
+
+    def _record(self, lag: float, beat: float):
+        """Log an incident, using the captured stack only if it was taken during this stall."""
+        captured = self._blocked_stack
+        stack = captured[1] if captured is not None and captured[0] == beat else []
+
+        lag_ms = round(lag * 1000, 2)
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+        self.incidents.append({
+            "detected_at": datetime.utcnow(),
+            "lag_ms": lag_ms,
+            "stack": stack
+        })
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "running": bool(self._task and not self._task.done()),
+            "interval_ms": self.interval * 1000,
+            "threshold_ms": self.threshold * 1000,
+            "max_lag_ms": self.max_lag_ms,
+            "incidents": list(self.incidents)
+        }
+
+
+class LoopProfiler:
+    """cProfile the event loop thread for a fixed window, one run at a time."""
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+
+    @property
+    def busy(self) -> bool:
+        return self._lock.locked()
+
+    async def profile(self, seconds: float, sort_by: str = "cumulative", limit: int = 50) -> str:
+        async with self._lock:
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                profiler.disable()
+
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats(sort_by).print_stats(limit)
+        return stream.getvalue()
+
+
+# Singleton instances
+loop_monitor = LoopLagMonitor()
+loop_profiler = LoopProfiler()
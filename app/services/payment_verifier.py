@@ -0,0 +1,217 @@
+"""
+Payment Verifier Service
+
+Creates Masumi payment requests and verifies them in batches.
+A single poll loop pages through the payment listing over a pooled HTTP
+client and resolves every pending job it finds, stopping as soon as all of
+them have been seen, instead of running one poll loop per job.
+"""
+from typing import Dict, Optional, Any
+from datetime import datetime, timezone, timedelta
+import asyncio
+import hashlib
+import logging
+import httpx
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# On-chain states that mean the purchaser's funds are locked for us
+PAID_STATES = {"FundsLocked", "ResultSubmitted", "Withdrawn"}
+
+# On-chain states that mean the job will never be paid
+FAILED_STATES = {"RefundRequested", "RefundWithdrawn", "Disputed", "DisputedWithdrawn", "FundsOrDatumInvalid"}
+
+
+class PaymentError(Exception):
+    """Raised when a payment cannot be created or will never be completed."""
+
+
+class PaymentVerifier:
+    def __init__(self):
+        self.base_url = settings.PAYMENT_SERVICE_URL.rstrip("/")
+        self.poll_interval = settings.PAYMENT_POLL_INTERVAL
+        self.page_size = settings.PAYMENT_PAGE_SIZE
+        self.max_pages = settings.PAYMENT_MAX_PAGES
+        self._client: Optional[httpx.AsyncClient] = None
+        self._pending: Dict[str, dict] = {}
+        self._poll_task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        """Payment verification needs an API key and a registered agent."""
+        return bool(settings.PAYMENT_API_KEY and settings.AGENT_IDENTIFIER)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared client so every poll reuses the same connection pool."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"token": settings.PAYMENT_API_KEY, "accept": "application/json"},
+                timeout=httpx.Timeout(10.0),
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=5)
+            )
+        return self._client
+
+    @staticmethod
+    def hash_input(input_json: str) -> str:
+        """Hash the job input so the purchaser can verify what we were paid for."""
+        return hashlib.sha256(input_json.encode("utf-8")).hexdigest()
+
+    async def create_payment_request(self, identifier_from_purchaser: str, input_hash: str) -> Dict[str, Any]:
+        """Register a payment request with the payment service and return its details."""
+        now = datetime.now(timezone.utc)
+        payload = {
+            "agentIdentifier": settings.AGENT_IDENTIFIER,
+            "network": settings.NETWORK,
+            "inputHash": input_hash,
+            "identifierFromPurchaser": identifier_from_purchaser,
+            "payByTime": (now + timedelta(seconds=settings.PAYMENT_PAY_BY_SECONDS)).isoformat(),
+            "submitResultTime": (now + timedelta(seconds=settings.PAYMENT_SUBMIT_RESULT_SECONDS)).isoformat(),
+            "metadata": f"Cold outreach job for {identifier_from_purchaser}"
+        }
+
+        try:
+            response = await self.client.post("/payment/", json=payload)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            raise PaymentError(f"Could not create payment request: {e}") from e
+
+        try:
+            data = response.json().get("data") or {}
+        except (ValueError, AttributeError):
+            data = {}
+        if not data.get("blockchainIdentifier"):
+            raise PaymentError("Payment service did not return a blockchain identifier")
+
+        return {
+            "blockchain_identifier": data["blockchainIdentifier"],
+            "pay_by_time": data.get("payByTime"),
+            "submit_result_time": data.get("submitResultTime"),
+            "unlock_time": data.get("unlockTime"),
+            "external_dispute_unlock_time": data.get("externalDisputeUnlockTime"),
+            "input_hash": input_hash
+        }
+
+    async def wait_for_payment(self, job_id: str, blockchain_identifier: str, pay_by_time: Optional[Any] = None):
+        """
+        Wait until the payment for a job is confirmed.
+        Raises PaymentError if the payment fails or is not made in time.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending[blockchain_identifier] = {
+            "job_id": job_id,
+            "future": future,
+            "deadline": self._parse_deadline(pay_by_time)
+        }
+        self._ensure_polling()
+
+        try:
+            await future
+        finally:
+            self._pending.pop(blockchain_identifier, None)
+
+    def _parse_deadline(self, pay_by_time: Optional[Any]) -> datetime:
+        """Payment service returns payByTime as epoch millis; fall back to our own window."""
+        try:
+            return datetime.fromtimestamp(int(pay_by_time) / 1000, tz=timezone.utc)
+        except (TypeError, ValueError):
+            return datetime.now(timezone.utc) + timedelta(seconds=settings.PAYMENT_PAY_BY_SECONDS)
+
+    def _ensure_polling(self):
+        """Start the shared poll loop if it isn't already running."""
+        if self._poll_task is None or self._poll_task.done():
+            self._poll_task = asyncio.create_task(self._poll_loop())
+
+    async def _poll_loop(self):
+        """Poll the payment service while any job is waiting for payment."""
+        while self._unresolved():
+            try:
+                await self._check_pending()
+            except Exception:
+                # Any failure is treated as transient - a dead poll task would strand every waiting job
+                logger.exception("Payment poll failed; retrying next tick")
+            self._expire_overdue()
+            if self._unresolved():
+                await asyncio.sleep(self.poll_interval)
+
+    async def _check_pending(self):
+        """
+        List payments a page at a time and resolve the pending ones we see.
+        Stops as soon as every pending identifier has shown up, so a tick costs
+        one or two requests however many jobs are waiting.
+        """
+        unseen = {key for key, entry in self._pending.items() if not entry["future"].done()}
+        cursor_id = None
+
+        for _ in range(self.max_pages):
+            params = {"network": settings.NETWORK, "limit": self.page_size}
+            if cursor_id:
+                params["cursorId"] = cursor_id
+
+            response = await self.client.get("/payment/", params=params)
+            response.raise_for_status()
+            body = response.json()
+            payments = ((body.get("data") if isinstance(body, dict) else None) or {}).get("Payments") or []
+
+            for payment in payments:
+                if not isinstance(payment, dict):
+                    continue
+                key = payment.get("blockchainIdentifier")
+                if key in unseen:
+                    unseen.discard(key)
+                    self._resolve(key, payment.get("onChainState"))
+
+            if not unseen or len(payments) < self.page_size:
+                break
+            cursor_id = payments[-1].get("id") if isinstance(payments[-1], dict) else None
+            if not cursor_id:
+                break
+        else:
+            logger.error(
+                "Payment listing hit PAYMENT_MAX_PAGES (%s pages of %s) with %s pending payments not found; "
+                "raise PAYMENT_MAX_PAGES or PAYMENT_PAGE_SIZE",
+                self.max_pages, self.page_size, len(unseen)
+            )
+            return
+
+        if unseen:
+            logger.warning("%s pending payments not listed by the payment service yet", len(unseen))
+
+    def _resolve(self, blockchain_identifier: Optional[str], on_chain_state: Optional[str]):
+        """Settle the waiting future for a payment once its state is final."""
+        entry = self._pending.get(blockchain_identifier)
+        if not entry or entry["future"].done():
+            return
+
+        if on_chain_state in PAID_STATES:
+            entry["future"].set_result(on_chain_state)
+        elif on_chain_state in FAILED_STATES:
+            entry["future"].set_exception(PaymentError(f"Payment failed with state {on_chain_state}"))
+
+    def _unresolved(self) -> int:
+        return sum(1 for entry in self._pending.values() if not entry["future"].done())
+
+    def _expire_overdue(self):
+        """Fail jobs whose pay-by time has passed."""
+        now = datetime.now(timezone.utc)
+        for entry in self._pending.values():
+            if not entry["future"].done() and entry["deadline"] < now:
+                entry["future"].set_exception(PaymentError("Payment was not received before the pay-by time"))
+
+    async def close(self):
+        """Stop polling and release pooled connections."""
+        if self._poll_task and not self._poll_task.done():
+            self._poll_task.cancel()
+        for entry in self._pending.values():
+            if not entry["future"].done():
+                entry["future"].set_exception(PaymentError("Payment verifier shut down"))
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Singleton instance
+payment_verifier = PaymentVerifier()
@@ -0,0 +1,198 @@
+"""
+Stage Graph Pipeline
+
+Small DAG executor for the agent's stages (scraper, research, copy, QA, ...).
+Each stage declares the values it reads and the values it produces; a stage
+starts as soon as all of its inputs exist, so independent stages run
+concurrently. Stage outputs can be cached by a hash of their inputs, and
+every run records per-stage timings - if a stage fails, the timings gathered
+so far are attached to the exception as `stage_timings`.
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from collections import OrderedDict
+import asyncio
+import hashlib
+import inspect
+import json
+import time
+
+
+class PipelineError(Exception):
+    """Raised when a stage graph is invalid or a stage misbehaves."""
+
+
+class Stage:
+    def __init__(
+        self,
+        name: str,
+        func: Callable[..., Any],
+        inputs: List[str],
+        outputs: List[str],
+        cache: bool = False
+    ):
+        """
+        `func` is called with one keyword argument per input and must return
+        a dict containing every declared output. It may be sync or async;
+        sync functions run in a worker thread so they never block the event loop.
+        """
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.cache = cache
+
+    async def run(self, values: Dict[str, Any]) -> Dict[str, Any]:
+        kwargs = {key: values[key] for key in self.inputs}
+        if inspect.iscoroutinefunction(self.func):
+            result = self.func(**kwargs)
+        else:
+            result = await asyncio.to_thread(self.func, **kwargs)
+        if inspect.isawaitable(result):
+            result = await result
+
+        missing = [key for key in self.outputs if key not in result]
+        if missing:
+            raise PipelineError(f"Stage '{self.name}' did not produce: {', '.join(missing)}")
+        return {key: result[key] for key in self.outputs}
+
+
+class StageCache:
+    """Bounded LRU cache of stage outputs keyed by stage name and input hash."""
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    @staticmethod
+    def key(stage: Stage, values: Dict[str, Any]) -> str:
+        payload = json.dumps(
+            {key: values[key] for key in stage.inputs},
+            sort_keys=True,
+            default=_json_default
+        )
+        return f"{stage.name}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: str, outputs: Dict[str, Any]):
+        if self.max_size <= 0:
+            return
+        self._entries[key] = outputs
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+def _json_default(value: Any) -> Any:
+    """Make Pydantic models and enums hashable as stage inputs."""
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    if hasattr(value, "value"):
+        return value.value
+    return str(value)
+
+
+class StageGraph:
+    def __init__(self, stages: List[Stage], cache: Optional[StageCache] = None):
+        self.stages = stages
+        self.cache = cache if cache is not None else StageCache()
+        self._producers = self._index_producers()
+
+    def _index_producers(self) -> Dict[str, Stage]:
+        producers: Dict[str, Stage] = {}
+        for stage in self.stages:
+            for key in stage.outputs:
+                if key in producers:
+                    raise PipelineError(f"'{key}' is produced by both '{producers[key].name}' and '{stage.name}'")
+                producers[key] = stage
+        return producers
+
+    def _validate(self, initial: Dict[str, Any]):
+        """Every input must come from the caller or another stage, with no cycles."""
+        for stage in self.stages:
+            for key in stage.inputs:
+                if key not in initial and key not in self._producers:
+                    raise PipelineError(f"Stage '{stage.name}' needs '{key}' but nothing provides it")
+
+        visiting, done = set(), set()
+
+        def visit(stage: Stage):
+            if stage.name in done:
+                return
+            if stage.name in visiting:
+                raise PipelineError(f"Cycle detected at stage '{stage.name}'")
+            visiting.add(stage.name)
+            for key in stage.inputs:
+                if key not in initial:
+                    visit(self._producers[key])
+            visiting.discard(stage.name)
+            done.add(stage.name)
+
+        for stage in self.stages:
+            visit(stage)
+
+    async def _run_stage(self, stage: Stage, values: Dict[str, Any], timings: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        timing: Dict[str, Any] = {"cached": False}
+
+        try:
+            cache_key = StageCache.key(stage, values) if stage.cache else None
+            outputs = self.cache.get(cache_key) if cache_key else None
+            timing["cached"] = outputs is not None
+            if outputs is None:
+                outputs = await stage.run(values)
+                if cache_key:
+                    self.cache.set(cache_key, outputs)
+        except asyncio.CancelledError:
+            timing["cancelled"] = True
+            raise
+        except Exception:
+            timing["failed"] = True
+            raise
+        finally:
+            timing["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            timings[stage.name] = timing
+
+        return outputs
+
+    async def run(self, initial: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+        """
+        Execute the graph and return (values, timings).
+        `values` holds the initial inputs plus every stage output.
+        """
+        self._validate(initial)
+
+        values = dict(initial)
+        timings: Dict[str, Dict[str, Any]] = {}
+        waiting = list(self.stages)
+        running: Dict[asyncio.Task, Stage] = {}
+
+        try:
+            while waiting or running:
+                for stage in [s for s in waiting if all(key in values for key in s.inputs)]:
+                    waiting.remove(stage)
+                    running[asyncio.create_task(self._run_stage(stage, values, timings))] = stage
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    running.pop(task)
+                    values.update(task.result())
+        except Exception as e:
+            # Stop the siblings and let them record their timings before reporting
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+            e.stage_timings = timings
+            raise
+        finally:
+            for task in running:
+                task.cancel()
+
+        return values, timings
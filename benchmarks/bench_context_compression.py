@@ -0,0 +1,100 @@
+"""
+Benchmark: personalization context compression
+
+Builds the copywriting prompt for a heavy input (a pasted LinkedIn profile,
+a scraped About page, long notes) with and without compression and reports
+prompt size and build time. Pass --live to also time a real Mistral call
+for each variant (needs MISTRAL_API_KEY).
+
+    python -m benchmarks.bench_context_compression [--live]
+"""
+import argparse
+import asyncio
+import time
+from app.models.schemas import EmailInput
+from app.services.context_compressor import context_compressor, estimate_tokens
+from app.services.email_generator import email_generator
+
+
+PROFILE = """Sarah Johnson is VP of Engineering at Enterprise Corp, leading a team of 240 engineers across four regions.
+She previously spent eight years at a large payments company where she scaled the platform team from 12 to 90 people.
+Sarah holds a degree in computer science and an MBA. She enjoys trail running, sourdough baking and volunteering at coding bootcamps.
+She recently spoke at DevConf about scaling engineering teams and the cost of slow code review.
+In the talk she said code review is the biggest bottleneck in their release process and that reviewers miss bugs under time pressure.
+Enterprise Corp is migrating its monolith to microservices and doubling its release cadence this year.
+Sarah is hiring senior engineers, staff engineers and engineering managers in London, Austin and Singapore.
+She endorsed colleagues for Kubernetes, Go, leadership and mentoring.
+"""
+
+ABOUT_PAGE = """Enterprise Corp was founded in 1998 and serves more than 4,000 financial institutions worldwide.
+Our mission is to make banking infrastructure reliable, secure and fast.
+We are headquartered in New York with offices in London, Austin, Singapore and Sydney.
+Our engineering organisation ships hundreds of pull requests a day across dozens of services.
+We care deeply about quality, and every change is peer reviewed before it reaches production.
+Careers: join a team that values ownership, curiosity and craftsmanship.
+Press: Enterprise Corp named a leader in core banking platforms for the third year running.
+Cookie policy, privacy policy, terms of service, accessibility statement and contact us.
+"""
+
+
+def heavy_input() -> EmailInput:
+    return EmailInput(
+        sender_name="Alex Chen",
+        sender_company="TechStartup AI",
+        sender_role="Founder & CEO",
+        recipient_name="Sarah Johnson",
+        recipient_company="Enterprise Corp",
+        recipient_role="VP of Engineering",
+        recipient_industry="Financial Services",
+        product_or_service="AI-powered code review platform",
+        value_proposition="Reduce code review time by 60% while catching 3x more bugs before production",
+        personalization_notes=(PROFILE + ABOUT_PAGE) * 6,
+        previous_interaction="We met briefly at DevConf after her talk on code review bottlenecks. " * 5,
+        specific_pain_points=["slow code review", "bugs reaching production", "reviewer fatigue"],
+        competitor_mentions="They evaluated a static analysis vendor last year but found too many false positives. " * 5
+    )
+
+
+def build_prompt(input_data: EmailInput) -> str:
+    context = email_generator._build_personalization_context(input_data)
+    return email_generator._build_prompt(input_data, context)
+
+
+def measure(label: str, input_data: EmailInput, runs: int = 50) -> str:
+    started = time.perf_counter()
+    for _ in range(runs):
+        prompt = build_prompt(input_data)
+    build_ms = (time.perf_counter() - started) * 1000 / runs
+    print(f"{label:<14} prompt: {len(prompt):>7} chars  ~{estimate_tokens(prompt):>6} tokens  build: {build_ms:6.2f} ms")
+    return prompt
+
+
+async def time_generation(prompts: dict):
+    for label, prompt in prompts.items():
+        started = time.perf_counter()
+        await email_generator._copy_stage(prompt)
+        print(f"{label:<14} generation: {time.perf_counter() - started:6.2f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--live", action="store_true", help="also time a real Mistral call per variant")
+    args = parser.parse_args()
+
+    input_data = heavy_input()
+    budget = context_compressor.token_budget
+
+    context_compressor.token_budget = 0
+    raw_prompt = measure("uncompressed", input_data)
+    context_compressor.token_budget = budget
+    compressed_prompt = measure("compressed", input_data)
+
+    saved = 1 - estimate_tokens(compressed_prompt) / estimate_tokens(raw_prompt)
+    print(f"budget: {budget} tokens, prompt reduced by {saved:.0%}")
+
+    if args.live:
+        asyncio.run(time_generation({"uncompressed": raw_prompt, "compressed": compressed_prompt}))
+
+
+if __name__ == "__main__":
+    main()
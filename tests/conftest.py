@@ -0,0 +1,6 @@
+"""
+Shared test setup - keeps the Mistral client happy without a real key.
+"""
+import os
+
+os.environ.setdefault("MISTRAL_API_KEY", "test-key")
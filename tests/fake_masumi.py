@@ -0,0 +1,74 @@
+"""
+Local stand-in for the Masumi payment service.
+
+Plugs into httpx via MockTransport, so a PaymentVerifier can be pointed at it
+without a network. Tests flip payment states with `set_state`.
+"""
+import itertools
+import json
+import httpx
+
+
+class FakeMasumiService:
+    def __init__(self, pay_by_time=None):
+        self.payments = {}
+        self.pay_by_time = pay_by_time
+        self.fail_creation = False
+        self.requests = []
+        self._ids = itertools.count(1)
+
+    def set_state(self, blockchain_identifier: str, state: str):
+        self.payments[blockchain_identifier]["onChainState"] = state
+
+    def add_history(self, count: int, state: str = "Withdrawn"):
+        """Seed older, already-settled payments that belong to other purchasers."""
+        for _ in range(count):
+            blockchain_identifier = f"old-{next(self._ids)}"
+            self.payments[blockchain_identifier] = {
+                "id": blockchain_identifier,
+                "blockchainIdentifier": blockchain_identifier,
+                "onChainState": state
+            }
+
+    def list_requests(self) -> list:
+        return [request for request in self.requests if request.method == "GET"]
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if request.headers.get("token") is None:
+            return httpx.Response(401, json={"status": "error"})
+
+        if request.method == "POST" and request.url.path.endswith("/payment/"):
+            if self.fail_creation:
+                return httpx.Response(500, json={"status": "error"})
+            body = json.loads(request.content)
+            blockchain_identifier = f"bc-{next(self._ids)}"
+            self.payments[blockchain_identifier] = {
+                "id": blockchain_identifier,
+                "blockchainIdentifier": blockchain_identifier,
+                "inputHash": body["inputHash"],
+                "onChainState": None
+            }
+            return httpx.Response(200, json={"status": "success", "data": {
+                "blockchainIdentifier": blockchain_identifier,
+                "payByTime": self.pay_by_time
+            }})
+
+        if request.method == "GET" and request.url.path.endswith("/payment/"):
+            # Newest first, paged by cursor like the real listing
+            payments = list(reversed(list(self.payments.values())))
+            cursor_id = request.url.params.get("cursorId")
+            if cursor_id:
+                ids = [payment["id"] for payment in payments]
+                payments = payments[ids.index(cursor_id) + 1:]
+            limit = int(request.url.params.get("limit", 10))
+            return httpx.Response(200, json={"status": "success", "data": {"Payments": payments[:limit]}})
+
+        return httpx.Response(404, json={"status": "error"})
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            transport=httpx.MockTransport(self.handler),
+            base_url="http://masumi.test/api/v1",
+            headers={"token": "test-token"}
+        )
@@ -0,0 +1,149 @@
+"""
+Tests for the token-budgeted personalization context compressor.
+"""
+from app.config import settings
+from app.models.schemas import EmailInput
+from app.services.context_compressor import ContextCompressor, context_compressor, estimate_tokens
+from app.services.email_generator import email_generator
+
+QUERY = "AI code review platform catching bugs before production"
+
+
+def total_tokens(sections):
+    return sum(estimate_tokens(s) for sentences in sections.values() for s in sentences)
+
+
+def test_under_budget_passes_through_untouched():
+    compressor = ContextCompressor(token_budget=500)
+    sections = {"Personal details": ["Spoke at DevConf.", "Runs trails."]}
+    assert compressor.compress(sections, QUERY) is sections
+
+
+def test_budget_is_respected_and_relevant_sentences_win():
+    compressor = ContextCompressor(token_budget=40)
+    filler = [f"Enjoys hobby number {i} on weekends with friends." for i in range(30)]
+    relevant = "Said slow code review lets bugs reach production."
+    sections = {"Personal details": filler[:15] + [relevant] + filler[15:]}
+
+    compressed = compressor.compress(sections, QUERY)
+
+    assert total_tokens(compressed) <= 40
+    assert relevant in compressed["Personal details"]
+
+
+def test_original_order_is_kept():
+    compressor = ContextCompressor(token_budget=30)
+    sections = {"Personal details": [
+        "Code review is her team's bottleneck.",
+        "Likes sourdough baking and trail running on weekends.",
+        "Bugs keep reaching production.",
+        "Volunteers at a bootcamp teaching beginners every month."
+    ]}
+
+    kept = compressor.compress(sections, QUERY)["Personal details"]
+
+    assert kept == ["Code review is her team's bottleneck.", "Bugs keep reaching production."]
+
+
+def test_near_duplicates_are_dropped():
+    compressor = ContextCompressor(token_budget=30)
+    sentence = "Said code review is the biggest bottleneck before production."
+    sections = {
+        "Personal details": [sentence, sentence.replace("Said", "She said"), "Hiring engineers in Austin this year."],
+        "Previous interaction": [sentence]
+    }
+
+    compressed = compressor.compress(sections, QUERY)
+    kept = compressed["Personal details"] + compressed["Previous interaction"]
+
+    assert sum("bottleneck" in s for s in kept) == 1
+
+
+def test_oversized_unpunctuated_blob_is_chunked_not_dropped():
+    compressor = ContextCompressor(token_budget=100)
+    blob = " ".join(["engineering leader"] * 400 + ["code review bugs production"])
+    sections = {"Personal details": compressor.split_sentences(blob)}
+    assert len(sections["Personal details"]) == 1
+
+    compressed = compressor.compress(sections, QUERY)
+
+    assert compressed["Personal details"]
+    assert total_tokens(compressed) <= 100
+    assert any("bugs production" in chunk for chunk in compressed["Personal details"])
+
+
+def test_structured_fields_survive_a_huge_pasted_profile(monkeypatch):
+    monkeypatch.setattr(context_compressor, "token_budget", 200)
+    profile = "\n".join(f"Profile line {i} about weekend hobbies and travel." for i in range(300))
+    input_data = EmailInput(
+        sender_name="Alex", sender_company="TechStartup AI", sender_role="CEO",
+        recipient_name="Sarah", recipient_company="Enterprise Corp",
+        product_or_service="AI code review platform", value_proposition="Catch bugs before production",
+        personalization_notes=profile,
+        specific_pain_points=["hiring is slow", "onboarding takes months"],
+        competitor_mentions="They use Acme."
+    )
+
+    context = email_generator._build_personalization_context(input_data)
+
+    assert "Pain points to address: hiring is slow, onboarding takes months" in context
+    assert "Competitor context: They use Acme." in context
+    assert "Personal details:" in context
+    assert estimate_tokens(context) < 260
+
+
+def make_input(**overrides) -> EmailInput:
+    fields = dict(
+        sender_name="Alex", sender_company="TechStartup AI", sender_role="CEO",
+        recipient_name="Sarah", recipient_company="Enterprise Corp",
+        product_or_service="AI code review platform", value_proposition="Catch bugs before production"
+    )
+    fields.update(overrides)
+    return EmailInput(**fields)
+
+
+def test_text_that_fits_keeps_its_formatting():
+    context = email_generator._build_personalization_context(make_input(personalization_notes="- likes A\n- likes B"))
+    assert "Personal details: - likes A\n- likes B" in context
+
+
+def test_budget_zero_disables_compression_and_keeps_formatting(monkeypatch):
+    monkeypatch.setattr(context_compressor, "token_budget", 0)
+    notes = "\n".join(f"- fact {i}" for i in range(500))
+    context = email_generator._build_personalization_context(make_input(personalization_notes=notes))
+    assert f"Personal details: {notes}" in context
+
+
+def test_pasted_competitor_page_is_compressed_not_kept_verbatim(monkeypatch):
+    monkeypatch.setattr(context_compressor, "token_budget", 200)
+    competitor_page = " ".join(f"Acme feature {i} does something unrelated." for i in range(150))
+    context = email_generator._build_personalization_context(make_input(
+        personalization_notes="Said code review lets bugs reach production.",
+        competitor_mentions=competitor_page
+    ))
+
+    assert "Competitor context:" in context
+    assert "Personal details: Said code review lets bugs reach production." in context
+    assert estimate_tokens(context) < 230
+
+
+def test_zero_remaining_budget_returns_empty_without_chunking():
+    compressor = ContextCompressor(token_budget=100)
+    compressed = compressor.compress({"Personal details": ["word " * 200]}, QUERY, token_budget=0)
+    assert compressed == {"Personal details": []}
+
+
+def test_words_longer_than_the_window_are_dropped_not_truncated():
+    compressor = ContextCompressor(token_budget=100)
+    url = "https://example.com/" + "a" * 200
+    chunks = compressor._chunk(f"see {url} for the code review results " * 5, 10)
+    assert all(url[:20] not in chunk for chunk in chunks)
+    assert any("code review" in chunk for chunk in chunks)
+
+
+def test_raw_input_is_capped_before_parsing(monkeypatch):
+    monkeypatch.setattr(settings, "CONTEXT_MAX_INPUT_CHARS", 1000)
+    monkeypatch.setattr(context_compressor, "token_budget", 0)
+    notes = "a" * 999 + " " + "SHOULD_NOT_APPEAR " * 100000
+    context = email_generator._build_personalization_context(make_input(personalization_notes=notes))
+    assert "SHOULD_NOT_APPEAR" not in context
@@ -0,0 +1,63 @@
+"""
+Tests for the token-guarded /debug endpoints.
+"""
+import asyncio
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.main import app
+
+TOKEN = "debug-secret"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, "DEBUG_API_TOKEN", TOKEN)
+    monkeypatch.setattr(settings, "PROFILE_MAX_SECONDS", 2.0)
+    with TestClient(app) as client:
+        yield client
+
+
+def test_debug_routes_hidden_when_token_unset(monkeypatch):
+    monkeypatch.setattr(settings, "DEBUG_API_TOKEN", "")
+    with TestClient(app) as client:
+        assert client.get("/debug/loop_lag").status_code == 404
+        assert client.get("/debug/loop_lag", headers={"X-Debug-Token": ""}).status_code == 404
+        assert client.get("/debug/profile?seconds=0.1", headers={"X-Debug-Token": "anything"}).status_code == 404
+
+
+def test_wrong_or_missing_token_is_404(client):
+    assert client.get("/debug/loop_lag").status_code == 404
+    assert client.get("/debug/loop_lag", headers={"X-Debug-Token": "wrong"}).status_code == 404
+    assert client.get("/debug/profile?seconds=0.1", headers={"X-Debug-Token": "wrong"}).status_code == 404
+
+
+def test_valid_token_returns_reports(client):
+    lag = client.get("/debug/loop_lag", headers={"X-Debug-Token": TOKEN})
+    assert lag.status_code == 200
+    assert lag.json()["running"] is True
+
+    profile = client.get("/debug/profile?seconds=0.1&limit=5", headers={"X-Debug-Token": TOKEN})
+    assert profile.status_code == 200
+    assert "function calls" in profile.text
+
+
+def test_profile_longer_than_max_is_rejected(client):
+    response = client.get("/debug/profile?seconds=5", headers={"X-Debug-Token": TOKEN})
+    assert response.status_code == 400
+
+
+def test_concurrent_profile_is_409(monkeypatch):
+    monkeypatch.setattr(settings, "DEBUG_API_TOKEN", TOKEN)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            headers = {"X-Debug-Token": TOKEN}
+            first = asyncio.create_task(client.get("/debug/profile?seconds=0.3", headers=headers))
+            await asyncio.sleep(0.1)
+            second = await client.get("/debug/profile?seconds=0.1", headers=headers)
+            return (await first).status_code, second.status_code
+
+    assert asyncio.run(scenario()) == (200, 409)
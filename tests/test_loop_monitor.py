@@ -0,0 +1,54 @@
+"""
+Tests for the event-loop lag monitor.
+"""
+import asyncio
+import time
+from app.services.loop_monitor import LoopLagMonitor
+
+
+def make_monitor() -> LoopLagMonitor:
+    monitor = LoopLagMonitor()
+    monitor.interval = 0.02
+    monitor.threshold = 0.1
+    return monitor
+
+
+def render_prompt_synchronously():
+    time.sleep(0.4)
+
+
+def test_blocking_call_is_recorded_with_its_stack():
+    async def scenario():
+        monitor = make_monitor()
+        monitor.start()
+        await asyncio.sleep(0.05)
+        render_prompt_synchronously()
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+        return monitor.report()
+
+    report = asyncio.run(scenario())
+    assert report["incidents"]
+    incident = report["incidents"][0]
+    assert incident["lag_ms"] >= 300
+    assert "render_prompt_synchronously" in "".join(incident["stack"])
+
+
+def test_stale_stack_is_not_attached_to_a_later_incident():
+    monitor = make_monitor()
+    monitor._blocked_stack = (1.0, ["stale frame\n"])
+
+    monitor._record(0.5, beat=2.0)
+
+    assert monitor.incidents[-1]["stack"] == []
+
+
+def test_lifespan_starts_and_stops_monitor():
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.services.loop_monitor import loop_monitor
+
+    with TestClient(app) as client:
+        assert client.get("/health").status_code == 200
+        assert loop_monitor.report()["running"]
+    assert not loop_monitor.report()["running"]
@@ -0,0 +1,327 @@
+"""
+Tests for the batched payment verifier and payment-gated job processing.
+"""
+import asyncio
+import gc
+import importlib
+import time
+import httpx
+import pytest
+from app.config import settings
+from app.models.schemas import EmailInput, JobStatus
+from app.services.job_manager import JobManager
+from app.services.payment_verifier import PaymentVerifier, PaymentError
+from tests.fake_masumi import FakeMasumiService
+
+# The package re-exports the singleton under the module's name, so go via importlib
+job_manager_module = importlib.import_module("app.services.job_manager")
+
+
+def make_verifier(service: FakeMasumiService) -> PaymentVerifier:
+    verifier = PaymentVerifier()
+    verifier.poll_interval = 0.01
+    verifier._client = service.client()
+    return verifier
+
+
+def email_input() -> EmailInput:
+    return EmailInput(
+        sender_name="Alex", sender_company="TechStartup AI", sender_role="CEO",
+        recipient_name="Sarah", recipient_company="Enterprise Corp",
+        product_or_service="Code review platform", value_proposition="Faster reviews"
+    )
+
+
+def test_paid_payment_resolves():
+    async def scenario():
+        service = FakeMasumiService()
+        verifier = make_verifier(service)
+        payment = await verifier.create_payment_request("buyer-1", "hash")
+        waiter = asyncio.create_task(verifier.wait_for_payment("job-1", payment["blockchain_identifier"]))
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        service.set_state(payment["blockchain_identifier"], "FundsLocked")
+        await asyncio.wait_for(waiter, 1)
+        await verifier.close()
+
+    asyncio.run(scenario())
+
+
+def test_failed_state_raises():
+    async def scenario():
+        service = FakeMasumiService()
+        verifier = make_verifier(service)
+        payment = await verifier.create_payment_request("buyer-1", "hash")
+        service.set_state(payment["blockchain_identifier"], "RefundRequested")
+        with pytest.raises(PaymentError, match="RefundRequested"):
+            await asyncio.wait_for(verifier.wait_for_payment("job-1", payment["blockchain_identifier"]), 1)
+        await verifier.close()
+
+    asyncio.run(scenario())
+
+
+def test_pay_by_expiry_fails_job():
+    async def scenario():
+        service = FakeMasumiService(pay_by_time=str(int((time.time() + 0.05) * 1000)))
+        verifier = make_verifier(service)
+        payment = await verifier.create_payment_request("buyer-1", "hash")
+        with pytest.raises(PaymentError, match="pay-by"):
+            await asyncio.wait_for(
+                verifier.wait_for_payment("job-1", payment["blockchain_identifier"], payment["pay_by_time"]), 1
+            )
+        await verifier.close()
+
+    asyncio.run(scenario())
+
+
+def test_one_poll_loop_serves_many_jobs():
+    async def scenario():
+        service = FakeMasumiService()
+        verifier = make_verifier(service)
+        verifier.poll_interval = 60
+        verifier.page_size = 4
+        payments = [await verifier.create_payment_request(f"buyer-{i}", "hash") for i in range(10)]
+        waiters = [
+            asyncio.create_task(verifier.wait_for_payment(f"job-{i}", p["blockchain_identifier"]))
+            for i, p in enumerate(payments)
+        ]
+        await asyncio.sleep(0.01)
+        poll_task = verifier._poll_task
+        first_tick = len(service.list_requests())
+
+        for p in payments:
+            service.set_state(p["blockchain_identifier"], "FundsLocked")
+        await verifier._check_pending()
+        await asyncio.wait_for(asyncio.gather(*waiters), 1)
+
+        # One shared task, and each tick pages through 10 jobs in ceil(10 / 4) list requests
+        assert verifier._poll_task is poll_task
+        assert first_tick == 3
+        assert len(service.list_requests()) == 6
+        assert all(int(r.url.params["limit"]) == 4 for r in service.list_requests())
+        await verifier.close()
+
+    asyncio.run(scenario())
+
+
+def test_listing_stops_once_every_pending_payment_is_seen():
+    async def scenario():
+        service = FakeMasumiService()
+        service.add_history(1000)
+        verifier = make_verifier(service)
+        verifier.poll_interval = 60
+        payments = [await verifier.create_payment_request(f"buyer-{i}", "hash") for i in range(10)]
+        waiters = [
+            asyncio.create_task(verifier.wait_for_payment(f"job-{i}", p["blockchain_identifier"]))
+            for i, p in enumerate(payments)
+        ]
+        await asyncio.sleep(0.01)
+
+        # Recent payments sit on the first page, so old history is never paged through
+        assert len(service.list_requests()) == 1
+        for waiter in waiters:
+            waiter.cancel()
+        await verifier.close()
+
+    asyncio.run(scenario())
+
+
+def test_page_cap_is_logged_loudly(caplog):
+    async def scenario():
+        service = FakeMasumiService()
+        verifier = make_verifier(service)
+        verifier.poll_interval = 60
+        verifier.page_size = 2
+        verifier.max_pages = 2
+        payment = await verifier.create_payment_request("buyer-1", "hash")
+        service.add_history(10)
+        waiter = asyncio.create_task(verifier.wait_for_payment("job-1", payment["blockchain_identifier"]))
+        await asyncio.sleep(0.01)
+
+        assert len(service.list_requests()) == 2
+        assert not waiter.done()
+        waiter.cancel()
+        await verifier.close()
+
+    with caplog.at_level("ERROR"):
+        asyncio.run(scenario())
+    assert "PAYMENT_MAX_PAGES" in caplog.text
+
+
+def test_unexpected_payload_does_not_kill_poll_loop():
+    async def scenario():
+        service = FakeMasumiService()
+        verifier = make_verifier(service)
+        payment = await verifier.create_payment_request("buyer-1", "hash")
+        service.set_state(payment["blockchain_identifier"], "FundsLocked")
+
+        calls = {"count": 0}
+        fake_handler = service.handler
+
+        def flaky(request):
+            calls["count"] += 1
+            if calls["count"] == 1:
+                return httpx.Response(200, json={"data": None})
+            if calls["count"] == 2:
+                return httpx.Response(200, text="not json")
+            return fake_handler(request)
+
+        verifier._client = httpx.AsyncClient(
+            transport=httpx.MockTransport(flaky), base_url="http://masumi.test/api/v1", headers={"token": "t"}
+        )
+        await asyncio.wait_for(verifier.wait_for_payment("job-1", payment["blockchain_identifier"]), 1)
+        assert calls["count"] >= 3
+        await verifier.close()
+
+    asyncio.run(scenario())
+
+
+def test_speculative_result_withheld_until_paid(monkeypatch):
+    async def scenario():
+        service = FakeMasumiService()
+        verifier = make_verifier(service)
+        manager = JobManager()
+        generated = asyncio.Event()
+
+        async def fake_pipeline(input_data):
+            generated.set()
+            return {"emails": ["Hi Sarah"]}, {"copy": {"duration_ms": 1.0, "cached": False}}
+
+        monkeypatch.setattr(settings, "PAYMENT_SPECULATIVE_EXECUTION", True)
+        monkeypatch.setattr(job_manager_module, "payment_verifier", verifier)
+        monkeypatch.setattr(job_manager_module.email_generator, "run_pipeline", fake_pipeline)
+
+        payment = await verifier.create_payment_request("buyer-1", "hash")
+        job_id = manager.create_job("buyer-1", email_input(), payment=payment)
+        processing = asyncio.create_task(manager.process_job(job_id))
+
+        await asyncio.wait_for(generated.wait(), 1)
+        await asyncio.sleep(0.05)
+        job = manager.get_job(job_id)
+        assert job["status"] == JobStatus.AWAITING_PAYMENT
+        assert job["result"] is None
+
+        service.set_state(payment["blockchain_identifier"], "FundsLocked")
+        await asyncio.wait_for(processing, 1)
+        assert job["status"] == JobStatus.COMPLETED
+        assert job["result"] == {"emails": ["Hi Sarah"]}
+        await verifier.close()
+
+    asyncio.run(scenario())
+
+
+def test_speculative_failure_is_retrieved_when_payment_fails(monkeypatch):
+    async def scenario():
+        service = FakeMasumiService()
+        verifier = make_verifier(service)
+        manager = JobManager()
+        unretrieved = []
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: unretrieved.append(context))
+
+        async def broken_pipeline(input_data):
+            raise RuntimeError("LLM down")
+
+        monkeypatch.setattr(settings, "PAYMENT_SPECULATIVE_EXECUTION", True)
+        monkeypatch.setattr(job_manager_module, "payment_verifier", verifier)
+        monkeypatch.setattr(job_manager_module.email_generator, "run_pipeline", broken_pipeline)
+
+        payment = await verifier.create_payment_request("buyer-1", "hash")
+        job_id = manager.create_job("buyer-1", email_input(), payment=payment)
+        processing = asyncio.create_task(manager.process_job(job_id))
+        await asyncio.sleep(0.05)
+        service.set_state(payment["blockchain_identifier"], "Disputed")
+        await asyncio.wait_for(processing, 1)
+
+        assert manager.get_job(job_id)["status"] == JobStatus.FAILED
+        await verifier.close()
+        gc.collect()
+        return unretrieved
+
+    assert not asyncio.run(scenario())
+
+
+def test_job_waits_for_payment_then_runs_in_worker_pool(monkeypatch):
+    async def scenario():
+        service = FakeMasumiService()
+        verifier = make_verifier(service)
+        manager = JobManager()
+        manager._worker_slots = asyncio.Semaphore(1)
+        calls = []
+
+        async def fake_pipeline(input_data):
+            calls.append(manager.worker_slots.locked())
+            return {"emails": ["Hi Sarah"]}, {}
+
+        monkeypatch.setattr(settings, "PAYMENT_SPECULATIVE_EXECUTION", False)
+        monkeypatch.setattr(job_manager_module, "payment_verifier", verifier)
+        monkeypatch.setattr(job_manager_module.email_generator, "run_pipeline", fake_pipeline)
+
+        payment = await verifier.create_payment_request("buyer-1", "hash")
+        job_id = manager.create_job("buyer-1", email_input(), payment=payment)
+        processing = asyncio.create_task(manager.process_job(job_id))
+
+        await asyncio.sleep(0.05)
+        service.set_state(payment["blockchain_identifier"], "WaitingForExternalAction")
+        await asyncio.sleep(0.05)
+        assert manager.get_job(job_id)["status"] == JobStatus.AWAITING_PAYMENT
+        assert calls == []
+
+        service.set_state(payment["blockchain_identifier"], "FundsLocked")
+        await asyncio.wait_for(processing, 1)
+        assert calls == [True]
+        assert manager.get_job(job_id)["status"] == JobStatus.COMPLETED
+        await verifier.close()
+
+    asyncio.run(scenario())
+
+
+@pytest.fixture
+def paid_api(monkeypatch):
+    """TestClient for /start_job with payments enabled against the fake service."""
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.services.job_manager import job_manager
+    from app.services.payment_verifier import payment_verifier
+
+    service = FakeMasumiService(pay_by_time="1900000000000")
+    processed = []
+
+    async def fake_process_job(job_id):
+        processed.append(job_id)
+
+    monkeypatch.setattr(settings, "PAYMENT_API_KEY", "test-token")
+    monkeypatch.setattr(settings, "AGENT_IDENTIFIER", "agent-123")
+    monkeypatch.setattr(payment_verifier, "_client", service.client())
+    monkeypatch.setattr(job_manager, "process_job", fake_process_job)
+
+    with TestClient(app) as client:
+        yield client, service, processed
+
+
+def start_job_body() -> dict:
+    return {"identifier_from_purchaser": "buyer-1", "input_data": email_input().model_dump(mode="json")}
+
+
+def test_start_job_returns_payment_info_and_awaiting_status(paid_api):
+    client, service, processed = paid_api
+
+    response = client.post("/start_job", json=start_job_body())
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "awaiting_payment"
+    assert body["payment_info"]["blockchain_identifier"] in service.payments
+    assert body["payment_info"]["pay_by_time"] == "1900000000000"
+    assert body["payment_info"]["agent_identifier"] == "agent-123"
+    assert body["payment_info"]["amount"] == settings.PAYMENT_AMOUNT
+    assert processed == [body["job_id"]]
+
+
+def test_start_job_returns_502_when_payment_request_fails(paid_api):
+    client, service, processed = paid_api
+    service.fail_creation = True
+
+    response = client.post("/start_job", json=start_job_body())
+
+    assert response.status_code == 502
+    assert processed == []
@@ -0,0 +1,154 @@
+"""
+Tests for the stage-graph pipeline executor.
+"""
+import asyncio
+import time
+import pytest
+from app.services.pipeline import Stage, StageGraph, StageCache, PipelineError
+
+
+async def _sleep_then(seconds: float, **outputs):
+    await asyncio.sleep(seconds)
+    return outputs
+
+
+def test_independent_stages_run_concurrently():
+    graph = StageGraph([
+        Stage("scrape", lambda company: _sleep_then(0.2, page=f"{company} page"), ["company"], ["page"]),
+        Stage("subjects", lambda company: _sleep_then(0.2, subjects=[company]), ["company"], ["subjects"]),
+        Stage("copy", lambda page, subjects: {"email": f"{subjects[0]}: {page}"}, ["page", "subjects"], ["email"])
+    ])
+
+    started = time.perf_counter()
+    values, timings = asyncio.run(graph.run({"company": "Acme"}))
+    elapsed = time.perf_counter() - started
+
+    assert values["email"] == "Acme: Acme page"
+    assert elapsed < 0.35
+    assert set(timings) == {"scrape", "subjects", "copy"}
+
+
+def test_cached_stage_is_not_rerun():
+    calls = []
+
+    def research(company):
+        calls.append(company)
+        return {"notes": company.upper()}
+
+    graph = StageGraph([Stage("research", research, ["company"], ["notes"], cache=True)])
+
+    _, first = asyncio.run(graph.run({"company": "acme"}))
+    values, second = asyncio.run(graph.run({"company": "acme"}))
+    asyncio.run(graph.run({"company": "globex"}))
+
+    assert values["notes"] == "ACME"
+    assert calls == ["acme", "globex"]
+    assert first["research"]["cached"] is False
+    assert second["research"]["cached"] is True
+
+
+def test_cache_size_zero_disables_caching():
+    calls = []
+    graph = StageGraph(
+        [Stage("research", lambda company: calls.append(company) or {"notes": company}, ["company"], ["notes"], cache=True)],
+        cache=StageCache(max_size=0)
+    )
+    asyncio.run(graph.run({"company": "acme"}))
+    asyncio.run(graph.run({"company": "acme"}))
+    assert calls == ["acme", "acme"]
+
+
+def test_cycle_is_rejected():
+    graph = StageGraph([
+        Stage("a", lambda y: {"x": y}, ["y"], ["x"]),
+        Stage("b", lambda x: {"y": x}, ["x"], ["y"])
+    ])
+    with pytest.raises(PipelineError, match="Cycle"):
+        asyncio.run(graph.run({}))
+
+
+def test_missing_input_is_rejected():
+    graph = StageGraph([Stage("copy", lambda research: {"email": research}, ["research"], ["email"])])
+    with pytest.raises(PipelineError, match="nothing provides"):
+        asyncio.run(graph.run({}))
+
+
+def test_duplicate_producer_is_rejected():
+    with pytest.raises(PipelineError, match="produced by both"):
+        StageGraph([
+            Stage("a", lambda: {"email": 1}, [], ["email"]),
+            Stage("b", lambda: {"email": 2}, [], ["email"])
+        ])
+
+
+def test_failure_cancels_siblings_and_keeps_partial_timings():
+    sibling_cancelled = asyncio.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            sibling_cancelled.set()
+            raise
+        return {"slow_out": 1}
+
+    async def broken(seed):
+        await asyncio.sleep(0.01)
+        raise RuntimeError("LLM down")
+
+    graph = StageGraph([
+        Stage("prep", lambda: {"seed": 1}, [], ["seed"]),
+        Stage("slow", slow, [], ["slow_out"]),
+        Stage("broken", broken, ["seed"], ["broken_out"])
+    ])
+
+    async def scenario():
+        with pytest.raises(RuntimeError) as excinfo:
+            await asyncio.wait_for(graph.run({}), 1)
+        return excinfo.value
+
+    error = asyncio.run(scenario())
+    assert sibling_cancelled.is_set()
+    assert error.stage_timings["prep"].get("failed") is None
+    assert error.stage_timings["broken"]["failed"] is True
+    assert error.stage_timings["slow"]["cancelled"] is True
+
+
+def test_failed_job_keeps_stage_timings(monkeypatch):
+    from app.models.schemas import EmailInput, JobStatus
+    from app.services.email_generator import email_generator
+    from app.services.job_manager import JobManager
+
+    async def broken_copy(prompt):
+        raise RuntimeError("LLM down")
+
+    monkeypatch.setattr(email_generator.pipeline.stages[2], "func", broken_copy)
+    manager = JobManager()
+    job_id = manager.create_job("buyer-1", EmailInput(
+        sender_name="Alex", sender_company="TechStartup AI", sender_role="CEO",
+        recipient_name="Sarah", recipient_company="Enterprise Corp",
+        product_or_service="Code review platform", value_proposition="Faster reviews"
+    ))
+    asyncio.run(manager.process_job(job_id))
+
+    job = manager.get_job(job_id)
+    assert job["status"] == JobStatus.FAILED
+    assert {"context", "prompt", "copy"} <= set(job["stage_timings"])
+    assert job["stage_timings"]["copy"]["failed"] is True
+
+
+def test_sync_stages_run_off_the_event_loop_thread():
+    import threading
+    threads = {}
+
+    def sync_stage(company):
+        threads["stage"] = threading.get_ident()
+        return {"notes": company}
+
+    async def scenario():
+        threads["loop"] = threading.get_ident()
+        return await StageGraph([Stage("research", sync_stage, ["company"], ["notes"])]).run({"company": "acme"})
+
+    values, _ = asyncio.run(scenario())
+    assert values["notes"] == "acme"
+    assert threads["stage"] != threads["loop"]